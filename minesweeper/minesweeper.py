@@ -1,5 +1,8 @@
 import itertools
 import random
+from collections import defaultdict, deque
+
+import numpy as np
 
 
 class Minesweeper():
@@ -12,23 +15,17 @@ class Minesweeper():
         # Set initial width, height, and number of mines
         self.height = height
         self.width = width
-        self.mines = set()
 
         # Initialize an empty field with no mines
-        self.board = []
-        for i in range(self.height):
-            row = []
-            for j in range(self.width):
-                row.append(False)
-            self.board.append(row)
+        self.board = np.zeros((height, width), dtype=bool)
 
         # Add mines randomly
-        while len(self.mines) != mines:
-            i = random.randrange(height)
-            j = random.randrange(width)
-            if not self.board[i][j]:
-                self.mines.add((i, j))
-                self.board[i][j] = True
+        mine_idx = random.sample(range(height * width), mines)
+        self.board.flat[mine_idx] = True
+        self.mines = {(int(i), int(j)) for i, j in np.argwhere(self.board)}
+
+        # Mines never move once placed, so count neighbours for every cell now
+        self._nearby = self.all_nearby_mines()
 
         # At first, player has found no mines
         self.mines_found = set()
@@ -49,8 +46,7 @@ class Minesweeper():
         print("--" * self.width + "-")
 
     def is_mine(self, cell):
-        i, j = cell
-        return self.board[i][j]
+        return bool(self.board[cell])
 
     def nearby_mines(self, cell):
         """
@@ -58,24 +54,22 @@ class Minesweeper():
         within one row and column of a given cell,
         not including the cell itself.
         """
+        return int(self._nearby[cell])
 
-        # Keep count of nearby mines
-        count = 0
-
-        # Loop over all cells within one row and column
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-
-                # Ignore the cell itself
-                if (i, j) == cell:
-                    continue
-
-                # Update count if cell in bounds and is mine
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    if self.board[i][j]:
-                        count += 1
-
-        return count
+    def all_nearby_mines(self):
+        """
+        Returns a (height, width) array holding, for every cell,
+        the number of mines within one row and column of it,
+        not including the cell itself.
+        """
+        # Sum the nine shifted copies of the zero-padded board,
+        # then take away each cell's own mine
+        padded = np.pad(self.board.astype(np.int8), 1)
+        counts = np.zeros((self.height, self.width), dtype=np.int8)
+        for di in range(3):
+            for dj in range(3):
+                counts += padded[di:di + self.height, dj:dj + self.width]
+        return counts - self.board
 
     def won(self):
         """
@@ -145,6 +139,24 @@ class MinesweeperAI():
         # Set initial height and width
         self.height = height
         self.width = width
+        self.all_cells = frozenset(
+            (i, j) for i in range(height) for j in range(width)
+        )
+
+        # One bit per cell, so that a set of cells fits in a single integer
+        self.bit = {(i, j): 1 << (i * width + j) for i, j in self.all_cells}
+        self.cell_of_bit = [(i, j) for i in range(height) for j in range(width)]
+
+        # Cells within one row and column of each cell, not including itself
+        self.neighbors = {
+            (i, j): frozenset(
+                (x, y)
+                for x in range(max(0, i - 1), min(height, i + 2))
+                for y in range(max(0, j - 1), min(width, j + 2))
+                if (x, y) != (i, j)
+            )
+            for i, j in self.all_cells
+        }
 
         # Keep track of which cells have been clicked on
         self.moves_made = set()
@@ -153,8 +165,27 @@ class MinesweeperAI():
         self.mines = set()
         self.safes = set()
 
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        # Sentences about the game known to be true, in insertion order,
+        # as (frozenset of cells, count) keys mapped to the bitmask of
+        # their cells. Keys are replaced rather than changed, and equal
+        # sentences share a key, so duplicates are found in O(1)
+        self._sentences = dict()
+
+        # Sentences mentioning each cell, sentences changed since they
+        # were last checked for known mines or safes, and sentences
+        # added since subset inference last ran
+        self.cell_to_sentences = defaultdict(set)
+        self.dirty = deque()
+        self.changed = set()
+
+    @property
+    def knowledge(self):
+        """
+        List of sentences about the game known to be true. The list and
+        its sentences are copies: changing them does not change what the
+        AI knows.
+        """
+        return [Sentence(cells, count) for cells, count in self._sentences]
 
     def mark_mine(self, cell):
         """
@@ -162,8 +193,9 @@ class MinesweeperAI():
         to mark that cell as a mine as well.
         """
         self.mines.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_mine(cell)
+        for cells, count in self.cell_to_sentences.pop(cell, ()):
+            self.remove_sentence((cells, count))
+            self.add_sentence(cells - {cell}, count - 1)
 
     def mark_safe(self, cell):
         """
@@ -171,36 +203,110 @@ class MinesweeperAI():
         to mark that cell as safe as well.
         """
         self.safes.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_safe(cell)
+        for cells, count in self.cell_to_sentences.pop(cell, ()):
+            self.remove_sentence((cells, count))
+            self.add_sentence(cells - {cell}, count)
+
+    def add_sentence(self, cells, count):
+        """
+        Adds the sentence `cells` = `count` to the knowledge base, unless
+        it is already known, and indexes it by its cells.
+        """
+        key = (frozenset(cells), count)
+        if key in self._sentences:
+            return
+        mask = 0
+        for cell in key[0]:
+            self.cell_to_sentences[cell].add(key)
+            mask |= self.bit[cell]
+        self._sentences[key] = mask
+        self.dirty.append(key)
+        self.changed.add(key)
+
+    def remove_sentence(self, key):
+        """
+        Removes a (cells, count) sentence from the knowledge base and from
+        the cell index.
+        """
+        del self._sentences[key]
+        for cell in key[0]:
+            sentences = self.cell_to_sentences.get(cell)
+            if sentences:
+                sentences.discard(key)
 
     def clean_up_knowledge(self):
-        self.knowledge = [s for s in self.knowledge 
-                        if len(s.cells) != 0
-                        and s.count != 0
-                        and s.count <= len(s.cells)]
+        for key in [(cells, count) for cells, count in self._sentences
+                    if len(cells) == 0
+                    or count == 0
+                    or count > len(cells)]:
+            self.remove_sentence(key)
 
-    def infer_from_subset(self):
-        """基于子集关系进行推理"""
+    def cells_of(self, mask):
+        """
+        Returns the set of cells whose bits are set in `mask`.
+        """
+        cells = set()
+        while mask:
+            low = mask & -mask
+            cells.add(self.cell_of_bit[low.bit_length() - 1])
+            mask ^= low
+        return cells
+
+    def infer_from_subset(self, changed):
+        """
+        Adds every sentence that follows from one sentence being a proper
+        subset of another, considering only pairs where at least one side
+        is in `changed`. Pairs of unchanged sentences were handled by an
+        earlier pass.
+        """
         new_sentences = []
-        
-        for sentence1 in self.knowledge:
-            for sentence2 in self.knowledge:
-                if sentence1 != sentence2:
-                    # 检查sentence1是否是sentence2的子集
-                    if sentence1.cells.issubset(sentence2.cells):
-                        # 创建新句子：大集合减去小集合
-                        new_cells = sentence2.cells - sentence1.cells
-                        new_count = sentence2.count - sentence1.count
-                        
-                        # 确保新句子是有效的
-                        if new_count >= 0 and new_cells:
-                            new_sentence = Sentence(new_cells, new_count)
-                            if new_sentence not in self.knowledge:
-                                new_sentences.append(new_sentence)
-        
-        # 添加新推断的句子
-        self.knowledge.extend(new_sentences)
+        for new_mask, new_count in self.subset_differences(changed):
+            new_cells = self.cells_of(new_mask)
+            # Keep new sentences that are valid and not already known
+            if new_count <= len(new_cells):
+                new_sentence = (frozenset(new_cells), new_count)
+                if new_sentence not in self._sentences:
+                    new_sentences.append(new_sentence)
+
+        # Add the inferred sentences
+        for new_cells, new_count in new_sentences:
+            self.add_sentence(new_cells, new_count)
+
+    def subset_differences(self, changed):
+        """
+        Returns (mask, count) for every sentence2 - sentence1 where
+        sentence1 is a proper subset of sentence2, at least one of the two
+        is in `changed`, and the count is not negative.
+        """
+        differences = set()
+        sentences = self._sentences
+
+        def add_difference(sentence1, sentence2):
+            # sentence1 is a proper subset when no bit of mask1 is outside
+            # mask2 and the masks differ
+            mask1 = sentences[sentence1]
+            mask2 = sentences[sentence2]
+            if mask1 & ~mask2 or mask1 == mask2:
+                return
+            # The larger sentence minus the smaller one
+            new_count = sentence2[1] - sentence1[1]
+            if new_count >= 0:
+                differences.add((mask2 & ~mask1, new_count))
+
+        for sentence in changed:
+            cells = sentence[0]
+            if not cells:
+                continue
+            # As the subset: any superset contains every one of its cells,
+            # so the index of a single cell lists all candidates
+            cell = next(iter(cells))
+            for other in self.cell_to_sentences[cell]:
+                add_difference(sentence, other)
+            # As the superset: a subset lies within its cells, so check the
+            # index of each of them
+            for other in set().union(*(self.cell_to_sentences[c] for c in cells)):
+                add_difference(other, sentence)
+        return differences
 
     def add_knowledge(self, cell, count):
         """
@@ -220,29 +326,24 @@ class MinesweeperAI():
         self.moves_made.add(cell)
         self.mark_safe(cell)
 
-        neighbor_cells = set()
-        for x in range(max(0, cell[0]-1), min(self.height, cell[0]+2)):
-            for y in range(max(0, cell[1]-1), min(self.width, cell[1]+2)):
-                if (x, y) != cell:
-                    neighbor_cells.add((x, y))
-
-        neighbor_cells = {c for c in neighbor_cells
-                        if c not in self.safes and c not in self.mines}
-        
-        mine_count = count - sum(1 for c in neighbor_cells if c in self.mines)
-
-        sentence = Sentence(cells=neighbor_cells, count=mine_count)
+        neighbor_cells = self.neighbors[cell]
+        mine_count = count - len(neighbor_cells & self.mines)
+        neighbor_cells = neighbor_cells - self.safes - self.mines
 
         if neighbor_cells:
-            self.knowledge.append(sentence)
-
-        while True:
-            knowledge_changed = False
+            self.add_sentence(neighbor_cells, mine_count)
 
+        # Stop as soon as a pass leaves no sentence to check for known
+        # mines or safes and none to use in subset inference
+        while self.dirty or self.changed:
             mines_to_mark = set()
             safes_to_mark = set()
 
-            for sentence in self.knowledge:
+            # Only sentences that changed can yield new mines or safes.
+            # Sentences removed since they were queued are still true,
+            # so they are checked as well
+            while self.dirty:
+                sentence = Sentence(*self.dirty.popleft())
                 for mine_cell in sentence.known_mines():
                     if mine_cell not in self.mines:
                         mines_to_mark.add(mine_cell)
@@ -252,21 +353,15 @@ class MinesweeperAI():
 
             for mine in mines_to_mark:
                 self.mark_mine(mine)
-                knowledge_changed = True
-            
+
             for safe in safes_to_mark:
                 self.mark_safe(safe)
-                knowledge_changed = True
 
-            old_knowledge_len = len(self.knowledge)
-            self.infer_from_subset()
+            # Sentences replaced since they were added no longer count
+            changed = {s for s in self.changed if s in self._sentences}
+            self.changed = set()
+            self.infer_from_subset(changed)
             self.clean_up_knowledge()
-            
-            if len(self.knowledge) != old_knowledge_len:
-                knowledge_changed = True
-
-            if not knowledge_changed:
-                break
 
     def make_safe_move(self):
         """
@@ -277,10 +372,7 @@ class MinesweeperAI():
         This function may use the knowledge in self.mines, self.safes
         and self.moves_made, but should not modify any of those values.
         """
-        for safe in self.safes:
-            if safe not in self.moves_made:
-                return safe
-        return None
+        return next(iter(self.safes - self.moves_made), None)
 
     def make_random_move(self):
         """
@@ -289,12 +381,7 @@ class MinesweeperAI():
             1) have not already been chosen, and
             2) are not known to be mines
         """
-        available_moves = []
-        for i in range(self.height):
-            for j in range(self.width):
-                if (i, j) not in self.moves_made and (i, j) not in self.mines:
-                    available_moves.append((i, j))
-        
+        available_moves = self.all_cells - self.moves_made - self.mines
         if not available_moves:
             return None
-        return random.choice(available_moves)
+        return random.choice(tuple(available_moves))
@@ -1,10 +1,17 @@
+import functools
 import os
 import random
 import re
 import sys
 
+import numpy as np
+
 DAMPING = 0.85
 SAMPLES = 10000
+THRESHOLD = 0.0001
+JIT_MIN_PAGES = 10000
+
+_HREF_RE = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
 
 
 def main():
@@ -35,19 +42,33 @@ def crawl(directory):
             continue
         with open(os.path.join(directory, filename)) as f:
             contents = f.read()
-            links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
-            pages[filename] = set(links) - {filename}
+            pages[filename] = _HREF_RE.findall(contents)
 
     # Only include links to other pages in the corpus
     for filename in pages:
         pages[filename] = set(
             link for link in pages[filename]
-            if link in pages
+            if link in pages and link != filename
         )
 
     return pages
 
 
+def link_choice(corpus, page, damping_factor):
+    """
+    Return a tuple (links, follow) describing a step away from `page`:
+    with probability `follow`, choose one of `links` at random, otherwise
+    choose any page in the corpus at random.
+
+    A page with no links never follows one, so every page in the corpus
+    is equally likely to come next.
+    """
+    links = corpus[page]
+    if not links:
+        return links, 0
+    return links, damping_factor
+
+
 def transition_model(corpus, page, damping_factor):
     """
     Return a probability distribution over which page to visit next,
@@ -57,21 +78,16 @@ def transition_model(corpus, page, damping_factor):
     linked to by `page`. With probability `1 - damping_factor`, choose
     a link at random chosen from all pages in the corpus.
     """
-    result = dict()
+    links, follow = link_choice(corpus, page, damping_factor)
     N = len(corpus)
-    
-    # 处理无出链的情况
-    if not corpus[page]:
-        return {p: 1/N for p in corpus}
-        
-    # 基础概率
-    for p in corpus:
-        result[p] = (1-damping_factor) / N
-    
+
+    # 基础概率（无出链的页面不跟随链接，即均匀分布）
+    result = {p: (1 - follow) / N for p in corpus}
+
     # 链接概率
-    for p in corpus[page]:
-        result[p] += damping_factor / len(corpus[page])
-    
+    for p in links:
+        result[p] += follow / len(links)
+
     return result
 
 
@@ -80,29 +96,41 @@ def sample_pagerank(corpus, damping_factor, n):
     Return PageRank values for each page by sampling `n` pages
     according to transition model, starting with a page at random.
 
+    Each step is drawn from the same `link_choice` that defines
+    `transition_model`, in O(1) time, without building the distribution.
+
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
-    count_dic = dict()
-    for p in corpus:
-        count_dic[p] = 0
-
-    current_page = random.choice(list(corpus.keys()))
-
-    for _ in range(n):
-        pages_distribution = transition_model(corpus=corpus, page=current_page, damping_factor=damping_factor)
-        pages = list(pages_distribution.keys())
-        weights = list(pages_distribution.values())
-        current_page = random.choices(pages, weights=weights, k=1)[0]
-        count_dic[current_page] = count_dic[current_page] + 1
-    
-    result = dict()
-
-    for p in count_dic:
-        result[p] = count_dic[p] / n
-
-    return result
+    pages = tuple(corpus)
+    index = {p: i for i, p in enumerate(pages)}
+    links = []
+    follow = []
+    for p in pages:
+        page_links, page_follow = link_choice(corpus, p, damping_factor)
+        links.append(tuple(sorted(index[q] for q in page_links)))
+        follow.append(page_follow)
+
+    # Draw from a generator seeded by `random`, so that random.seed()
+    # alone makes a run reproducible
+    rng = np.random.default_rng(random.getrandbits(64))
+    follow_draw = rng.random(n).tolist()
+    choice = rng.random(n).tolist()
+
+    i = random.randrange(len(pages))
+    visits = np.empty(n, dtype=np.intp)
+    for k in range(n):
+        if follow_draw[k] < follow[i]:
+            outlinks = links[i]
+            i = outlinks[int(choice[k] * len(outlinks))]
+        else:
+            i = int(choice[k] * len(pages))
+        visits[k] = i
+
+    counts = np.bincount(visits, minlength=len(pages)).astype(np.int64)
+
+    return {p: float(counts[i] / n) for i, p in enumerate(pages)}
 
 
 def iterate_pagerank(corpus, damping_factor):
@@ -114,43 +142,97 @@ def iterate_pagerank(corpus, damping_factor):
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
-    page_rank = dict()
+    pages = list(corpus)
+    links = inbound_links(corpus, pages)
 
-    for page in corpus:
-        page_rank[page] = 1 / len(corpus)
-    
-    new_page_rank = iterate_transition(corpus=corpus, page_rank=page_rank, damping_factor=damping_factor)
-    while(not(should_stop(page_rank, new_page_rank))):
+    page_rank = np.full(len(pages), 1 / len(pages))
+
+    new_page_rank = iterate_transition(links, page_rank, damping_factor)
+    while not should_stop(page_rank, new_page_rank):
         page_rank = new_page_rank
-        new_page_rank = new_page_rank = iterate_transition(corpus=corpus, page_rank=page_rank, damping_factor=damping_factor)
+        new_page_rank = iterate_transition(links, page_rank, damping_factor)
 
-    return new_page_rank
+    return {page: float(new_page_rank[i]) for i, page in enumerate(pages)}
 
-def iterate_transition(corpus, page_rank, damping_factor):
-    page_sum = len(page_rank)
-    new_page_rank = dict()
-    for p in page_rank:
-        new_page_rank[p] = (1-damping_factor)/page_sum
-        lps = link_pages(corpus, p)
-        for link_page in lps:
-            new_page_rank[p] = new_page_rank[p] + damping_factor*page_rank[link_page]/len(corpus[link_page])
 
-    return new_page_rank
+def inbound_links(corpus, pages):
+    """
+    Return a tuple (indptr, targets, sources, weights, dangling) describing
+    the links of `corpus`, with pages numbered by their position in `pages`.
+
+    Each link from page `sources[k]` to page `targets[k]` is followed with
+    probability `weights[k]`, one over the out-degree of its source. Links
+    are grouped by target, so this is the reverse-link index of the corpus,
+    and the links into page i are those from `indptr[i]` to `indptr[i + 1]`.
+    `dangling` is a boolean mask of pages with no links, whose rank is
+    spread evenly over every page in the corpus.
+    """
+    page_index = {page: i for i, page in enumerate(pages)}
+    outdeg = np.array([len(corpus[page]) for page in pages])
+
+    inbound = {page: [] for page in pages}
+    for source in pages:
+        for link in corpus[source]:
+            inbound[link].append(page_index[source])
+
+    targets = np.array(
+        [i for i, page in enumerate(pages) for _ in inbound[page]], dtype=np.intp
+    )
+    sources = np.array(
+        [j for page in pages for j in inbound[page]], dtype=np.intp
+    )
+    weights = 1 / outdeg[sources]
+    indptr = np.zeros(len(pages) + 1, dtype=np.intp)
+    np.cumsum([len(inbound[page]) for page in pages], out=indptr[1:])
+
+    return indptr, targets, sources, weights, outdeg == 0
+
+
+def iterate_transition(links, page_rank, damping_factor):
+    indptr, targets, sources, weights, dangling = links
+    N = len(page_rank)
+    dangling_mass = page_rank[dangling].sum()
+    base = (1 - damping_factor) / N + damping_factor * dangling_mass / N
+
+    kernel = jit_kernel() if N >= JIT_MIN_PAGES else None
+    if kernel is not None:
+        new_page_rank = np.empty(N)
+        kernel(indptr, sources, weights, page_rank, base, damping_factor, new_page_rank)
+        return new_page_rank
+
+    linked_mass = np.bincount(targets, weights=weights * page_rank[sources], minlength=N)
+    return base + damping_factor * linked_mass
+
+
+@functools.cache
+def jit_kernel():
+    """
+    Return a Numba-compiled function that computes one PageRank update
+    over the reverse-link index, one page per parallel loop iteration,
+    or None if Numba is not installed.
+
+    Numba is only imported, and the kernel only compiled, the first time
+    a corpus of at least JIT_MIN_PAGES pages is ranked, since on smaller
+    corpora compiling costs more than it saves.
+    """
+    try:
+        import numba
+    except ImportError:
+        return None
+
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def kernel(indptr, sources, weights, page_rank, base, damping_factor, out):
+        for i in numba.prange(page_rank.size):
+            s = 0.0
+            for k in range(indptr[i], indptr[i + 1]):
+                s += weights[k] * page_rank[sources[k]]
+            out[i] = base + damping_factor * s
+
+    return kernel
+
 
 def should_stop(previous_page_rank, page_rank):
-    sum = 0
-    for page in page_rank:
-        if abs(previous_page_rank[page]-page_rank[page]) < 0.0001:
-            sum = sum + 1
-    
-    return sum == len(page_rank)
-
-def link_pages(corpus, page):
-    result = []
-    for key in corpus:
-        if page in corpus[key]:
-            result.append(key)
-    return result
+    return np.max(np.abs(previous_page_rank - page_rank)) < THRESHOLD
 
 
 if __name__ == "__main__":
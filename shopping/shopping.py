@@ -1,8 +1,11 @@
-import csv
 import sys
 
+import numpy as np
+import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.neighbors import KNeighborsClassifier
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
 
 TEST_SIZE = 0.4
 
@@ -33,30 +36,32 @@ def main():
 
 def load_data(filename):
     """
-    Load shopping data from a CSV file `filename` and convert into a list of
-    evidence lists and a list of labels. Return a tuple (evidence, labels).
+    Load shopping data from a CSV file `filename` and convert into an array
+    of evidence rows and an array of labels. Return a tuple (evidence, labels).
 
-    evidence should be a list of lists, where each list contains the
+    evidence should be a 2-D float64 array, where each row contains the
     following values, in order:
-        - Administrative, an integer
+        - Administrative, a whole-number count
         - Administrative_Duration, a floating point number
-        - Informational, an integer
+        - Informational, a whole-number count
         - Informational_Duration, a floating point number
-        - ProductRelated, an integer
+        - ProductRelated, a whole-number count
         - ProductRelated_Duration, a floating point number
         - BounceRates, a floating point number
         - ExitRates, a floating point number
         - PageValues, a floating point number
         - SpecialDay, a floating point number
         - Month, an index from 0 (January) to 11 (December)
-        - OperatingSystems, an integer
-        - Browser, an integer
-        - Region, an integer
-        - TrafficType, an integer
-        - VisitorType, an integer 0 (not returning) or 1 (returning)
-        - Weekend, an integer 0 (if false) or 1 (if true)
-
-    labels should be the corresponding list of labels, where each label
+        - OperatingSystems, a whole-number code
+        - Browser, a whole-number code
+        - Region, a whole-number code
+        - TrafficType, a whole-number code
+        - VisitorType, 0 (not returning) or 1 (returning)
+        - Weekend, 0 (if false) or 1 (if true)
+
+    Raises KeyError if a row has a Month that is not recognised.
+
+    labels should be the corresponding 1-D array of labels, where each label
     is 1 if Revenue is true, and 0 otherwise.
     """
     month_to_num = {
@@ -74,42 +79,36 @@ def load_data(filename):
         "Dec": 11
     }
 
-    def convert_element(index, value):
-        match index:
-            case 0 | 2 | 4 | 11 | 12 | 13 | 14:
-                return int(value)
-            case 1 | 3 | 5 | 6 | 7 | 8 | 9:
-                return float(value)
-            case 10:
-                return month_to_num[value]
-            case 15:
-                return 1 if "returning" in value.lower() else 0
-            case 16:
-                return 1 if value == "TRUE" else 0
-
-    evidence = []
-    labels = []
-    with open(filename, newline='', encoding='utf-8') as csvfile:
-        reader = csv.reader(csvfile)
-        
-        for i, row in enumerate(reader):
-            if i == 0: continue
-            label = 1 if row.pop() == "TRUE" else 0
-            data = [convert_element(index, value) for index, value in enumerate(row)]
-            labels.append(label)
-            evidence.append(data)
+    df = pd.read_csv(filename)
+
+    months = df["Month"].map(month_to_num)
+    if months.isna().any():
+        unknown = df.loc[months.isna(), "Month"].iloc[0]
+        raise KeyError(unknown)
+    df["Month"] = months
+    df["VisitorType"] = df["VisitorType"].str.lower().str.contains("returning").astype(int)
+    df["Weekend"] = df["Weekend"].astype(str).str.upper().eq("TRUE").astype(int)
+
+    labels = df.pop("Revenue").astype(str).str.upper().eq("TRUE").astype(int).to_numpy()
+    evidence = df.to_numpy(dtype=np.float64)
 
     return (evidence, labels)
 
 
 def train_model(evidence, labels):
     """
-    Given a list of evidence lists and a list of labels, return a
-    fitted k-nearest neighbor model (k=1) trained on the data.
+    Given a 2-D array of evidence and a 1-D array of labels, return a
+    fitted Pipeline that standardizes each feature and then classifies
+    with a k-nearest neighbor model (k=1).
     """
-    knc = KNeighborsClassifier(n_neighbors=1)
-    knc.fit(evidence, labels)
-    return knc
+    # Scale features first so that no single column, such as
+    # ProductRelated_Duration, dominates the distance metric
+    model = make_pipeline(
+        StandardScaler(),
+        KNeighborsClassifier(n_neighbors=1, algorithm="kd_tree", leaf_size=40, n_jobs=-1)
+    )
+    model.fit(evidence, labels)
+    return model
 
 
 def evaluate(labels, predictions):
@@ -127,26 +126,17 @@ def evaluate(labels, predictions):
     representing the "true negative rate": the proportion of
     actual negative labels that were accurately identified.
     """
-    label_positive_amount = 0
-    label_negative_amount = 0
-    pred_positive_amount = 0
-    pred_negative_amount = 0
-    for index in range(0, len(predictions) - 1):
-        label = labels[index]
-        prediction = predictions[index]
-        if label == 1:
-            label_positive_amount += 1
-            if prediction == 1:
-                pred_positive_amount += 1
-        if label == 0:
-            label_negative_amount += 1
-            if prediction == 0:
-                pred_negative_amount += 1
-    
-    sensitivity = float(pred_positive_amount) / float(label_positive_amount)
-    specificity = float(pred_negative_amount) / float(label_negative_amount)
+    labels = np.asarray(labels)
+    predictions = np.asarray(predictions)
+
+    positive = labels == 1
+    negative = labels == 0
+    if not positive.any() or not negative.any():
+        raise ZeroDivisionError("labels must include both positive and negative examples")
+
+    sensitivity = float((predictions[positive] == 1).mean())
+    specificity = float((predictions[negative] == 0).mean())
     return (sensitivity, specificity)
-    
 
 
 